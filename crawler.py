@@ -3,22 +3,62 @@
 Stock price crawler that fetches daily prices and saves them in a GitHub Pages friendly format.
 """
 
+import contextlib
 import datetime
+import functools
 import requests
 import time
 import json
+import os
+import random
 import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from lxml import html
+from urllib.parse import urlparse
+from lxml import etree, html
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    # orjson is only a speed-up, fall back to the stdlib encoder/decoder
+    json_loads = json.loads
+
+    def json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+# Patterns used by minify_html, compiled once instead of on every call
+HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+TAG_WHITESPACE_RE = re.compile(r'>\s+<')
+STYLE_BLOCK_RE = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_WHITESPACE_RE = re.compile(r'\s*([{}:;,])\s*')
+
+def compress_css(match):
+    """Compress the CSS of a matched <style> block."""
+    css = match.group(1)
+    # Remove comments
+    css = CSS_COMMENT_RE.sub('', css)
+    # Remove whitespace around colons, semicolons, braces
+    css = CSS_WHITESPACE_RE.sub(r'\1', css)
+    # Remove whitespace at start/end
+    css = css.strip()
+    return f'<style>{css}</style>'
 
 def minify_html(html_content):
     """Minify HTML by removing unnecessary whitespace and newlines."""
     # Remove HTML comments
-    html_content = re.sub(r'<!--.*?-->', '', html_content, flags=re.DOTALL)
+    html_content = HTML_COMMENT_RE.sub('', html_content)
     
     # Remove whitespace between tags (but preserve space in text content)
-    html_content = re.sub(r'>\s+<', '><', html_content)
+    html_content = TAG_WHITESPACE_RE.sub('><', html_content)
     
     # Remove leading/trailing whitespace from lines
     lines = html_content.split('\n')
@@ -26,81 +66,238 @@ def minify_html(html_content):
     html_content = ''.join(minified_lines)
     
     # Compress CSS (remove unnecessary whitespace in style tags)
-    def compress_css(match):
-        css = match.group(1)
-        # Remove comments
-        css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
-        # Remove whitespace around colons, semicolons, braces
-        css = re.sub(r'\s*([{}:;,])\s*', r'\1', css)
-        # Remove whitespace at start/end
-        css = css.strip()
-        return f'<style>{css}</style>'
-    
-    html_content = re.sub(r'<style>(.*?)</style>', compress_css, html_content, flags=re.DOTALL)
+    html_content = STYLE_BLOCK_RE.sub(compress_css, html_content)
     
     return html_content
 
-# Market configuration with tickers and crawler functions
-
 # Base directory for storing price data
 DATA_DIR = Path("data")
 
-def fetch_all_tefas_data(date=None):
-    """Fetch all fund data from TEFAS API for a specific date."""
-    if date is None:
-        date = datetime.datetime.now()
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0'
+
+# Shared session so repeated requests to the same host reuse the pooled
+# TCP/TLS connection, with automatic retries that honour Retry-After on 429s
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': USER_AGENT})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True
+    )
+))
+
+# Headers for the TEFAS history page request that sets the session cookies.
+# Both TEFAS header sets advertise ACCEPT_ENCODING, which lists only the codecs
+# urllib3 can decode here (gzip, deflate, plus br/zstd when brotli/zstandard
+# are installed), so a compressed reply never reaches a parser undecoded
+TEFAS_PAGE_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Priority': 'u=1'
+}
+
+# Headers for the TEFAS history API request
+TEFAS_API_HEADERS = {
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Origin': 'https://www.tefas.gov.tr',
+    'Connection': 'keep-alive',
+    'Referer': 'https://www.tefas.gov.tr/TarihselVeriler.aspx',
+    'Sec-Fetch-Dest': 'empty',
+    'Sec-Fetch-Mode': 'cors',
+    'Sec-Fetch-Site': 'same-origin',
+    'Priority': 'u=0',
+    'Pragma': 'no-cache',
+    'Cache-Control': 'no-cache'
+}
+
+# Minimum spacing in seconds between requests to the same host
+HOST_MIN_INTERVAL = {
+    'www.tefas.gov.tr': 2.0,
+}
+
+# Current backoff delay in seconds per host, grows after 429/5xx or network errors
+# and follows the response time of the last request otherwise
+HOST_BACKOFF = {}
+
+# Upper bound in seconds for the backoff, including server-sent Retry-After values
+MAX_BACKOFF = 60.0
+
+# On the happy path, space requests by this fraction of the last response time,
+# up to RESPONSE_TIME_SPACING_CAP seconds, so a slowing server gets breathing room
+RESPONSE_TIME_SPACING = 0.5
+RESPONSE_TIME_SPACING_CAP = 2.0
+
+# Monotonic start time of the last request per host; this and HOST_BACKOFF
+# are only read and written under THROTTLE_LOCK
+HOST_LAST_REQUEST = {}
+THROTTLE_LOCK = threading.Lock()
+
+
+def grown_backoff(delay):
+    """Double a backoff delay with +/-20% jitter, capped at MAX_BACKOFF."""
+    return min(max(delay * 2, 1.0) * random.uniform(0.8, 1.2), MAX_BACKOFF)
+
+def throttled_request(method, url, **kwargs):
+    """Send a request through SESSION, spacing requests to the same host."""
+    host = urlparse(url).netloc
     
-    date_str = date.strftime("%d.%m.%Y")
-    print(f"Fetching all TEFAS data for {date_str}...")
+    # Reserve the next slot for this host under the lock, then sleep outside it
+    with THROTTLE_LOCK:
+        now = time.monotonic()
+        interval = max(HOST_MIN_INTERVAL.get(host, 0.0), HOST_BACKOFF.get(host, 0.0))
+        start = max(now, HOST_LAST_REQUEST.get(host, -interval) + interval)
+        HOST_LAST_REQUEST[host] = start
+    if start > now:
+        time.sleep(start - now)
     
     try:
-        # First, get cookies by visiting the main page
-        session = requests.Session()
-        
-        # Headers for initial request to get cookies
-        initial_headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Priority': 'u=1'
-        }
+        response = SESSION.request(method, url, **kwargs)
+    except requests.exceptions.RequestException:
+        with THROTTLE_LOCK:
+            HOST_BACKOFF[host] = grown_backoff(HOST_BACKOFF.get(host, 0.0))
+        raise
+    
+    # Update the backoff from its current value, so concurrent requests build on each other's
+    with THROTTLE_LOCK:
+        delay = HOST_BACKOFF.get(host, 0.0)
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get('Retry-After', '')
+            retry_after = min(float(retry_after), MAX_BACKOFF) if retry_after.isdigit() else 0.0
+            HOST_BACKOFF[host] = max(retry_after, grown_backoff(delay))
+        else:
+            # Decay towards no delay at all on the happy path, unless the server is answering slowly
+            spacing = min(response.elapsed.total_seconds() * RESPONSE_TIME_SPACING, RESPONSE_TIME_SPACING_CAP)
+            HOST_BACKOFF[host] = max(delay * 0.8 if delay > 0.1 else 0.0, spacing)
+    
+    return response
+
+# TEFAS cookies are kept between runs so a cold start can go straight to the API
+TEFAS_COOKIE_CACHE = Path.home() / ".cache" / "tefas_cookies.json"
+
+# True while SESSION holds cookies loaded from TEFAS_COOKIE_CACHE that the API
+# has not accepted yet in this process
+TEFAS_COOKIES_FROM_DISK = False
+
+# Guards priming and TEFAS_COOKIES_FROM_DISK, backfill workers share SESSION
+TEFAS_SESSION_LOCK = threading.RLock()
+
+def tefas_cookies():
+    """Return the TEFAS cookies currently held by SESSION."""
+    return [cookie for cookie in SESSION.cookies if cookie.domain.endswith('tefas.gov.tr')]
+
+def tefas_cookie_values():
+    """Return the (name, value) pairs of the TEFAS cookies currently held by SESSION."""
+    return {(cookie.name, cookie.value) for cookie in tefas_cookies()}
+
+def load_tefas_cookies():
+    """Load the unexpired cookies saved by a previous run into SESSION, True if any were found."""
+    global TEFAS_COOKIES_FROM_DISK
+    try:
+        cookies = [
+            requests.cookies.create_cookie(cookie['name'], cookie['value'], domain=cookie['domain'],
+                                           path=cookie['path'], expires=cookie['expires'])
+            for cookie in json_loads(TEFAS_COOKIE_CACHE.read_bytes())
+        ]
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    
+    for cookie in cookies:
+        if not cookie.is_expired():
+            SESSION.cookies.set_cookie(cookie)
+    TEFAS_COOKIES_FROM_DISK = bool(tefas_cookies())
+    return TEFAS_COOKIES_FROM_DISK
+
+def save_tefas_cookies():
+    """Persist the TEFAS cookies held by SESSION for the next run."""
+    cookies = [
+        {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain,
+         'path': cookie.path, 'expires': cookie.expires}
+        for cookie in tefas_cookies()
+    ]
+    try:
+        TEFAS_COOKIE_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        TEFAS_COOKIE_CACHE.write_bytes(json_dumps(cookies))
+    except OSError as e:
+        print(f"Could not save TEFAS cookies: {e}")
+
+def prime_tefas_session(refresh=False):
+    """Make sure SESSION holds TEFAS cookies, refresh=True replaces the current ones."""
+    global TEFAS_COOKIES_FROM_DISK
+    with TEFAS_SESSION_LOCK:
+        if refresh:
+            for cookie in tefas_cookies():
+                SESSION.cookies.clear(cookie.domain, cookie.path, cookie.name)
+        elif tefas_cookies() or load_tefas_cookies():
+            return True
         
         # Visit the main page to get session cookies
-        main_page = session.get('https://www.tefas.gov.tr/TarihselVeriler.aspx', headers=initial_headers, timeout=10)
+        main_page = throttled_request('GET', 'https://www.tefas.gov.tr/TarihselVeriler.aspx', headers=TEFAS_PAGE_HEADERS, timeout=10)
         print(f"Main page response status: {main_page.status_code}")
         
         if main_page.status_code != 200:
             print(f"Failed to access main page. Status code: {main_page.status_code}")
+            return False
+        
+        TEFAS_COOKIES_FROM_DISK = False
+        save_tefas_cookies()
+        return True
+
+def forget_tefas_cookies():
+    """Delete the saved TEFAS cookies so no later run reuses them."""
+    try:
+        TEFAS_COOKIE_CACHE.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Could not delete saved TEFAS cookies: {e}")
+
+def refresh_tefas_session(rejected_cookies, from_disk):
+    """Replace TEFAS cookies the API rejected, unless another thread already has."""
+    with TEFAS_SESSION_LOCK:
+        if tefas_cookies() and tefas_cookie_values() != rejected_cookies:
+            return True
+        if from_disk:
+            forget_tefas_cookies()
+        return prime_tefas_session(refresh=True)
+
+def parse_json_response(response):
+    """Return the parsed body of a 2xx JSON response, None for anything else."""
+    if not response.ok:
+        return None
+    try:
+        return json_loads(response.content)
+    except ValueError:
+        return None
+
+def fetch_all_tefas_data(date=None):
+    """Fetch all fund data from TEFAS API for a specific date."""
+    global TEFAS_COOKIES_FROM_DISK
+    if date is None:
+        date = datetime.datetime.now()
+    
+    date_str = date.strftime("%d.%m.%Y")
+    print(f"Fetching all TEFAS data for {date_str}...")
+    
+    try:
+        # Make sure the session holds the TEFAS cookies before calling the API
+        if not prime_tefas_session():
             return None
         
         # Now make the API request with the session cookies
         api_url = 'https://www.tefas.gov.tr/api/DB/BindHistoryInfo'
         
-        # Headers for API request
-        api_headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:142.0) Gecko/20100101 Firefox/142.0',
-            'Accept': 'application/json, text/javascript, */*; q=0.01',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate, br, zstd',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Origin': 'https://www.tefas.gov.tr',
-            'Connection': 'keep-alive',
-            'Referer': 'https://www.tefas.gov.tr/TarihselVeriler.aspx',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-origin',
-            'Priority': 'u=0',
-            'Pragma': 'no-cache',
-            'Cache-Control': 'no-cache'
-        }
-        
         # Request data for ALL funds (empty fonkod)
         data = {
             'fontip': 'YAT',  # Fund type
@@ -114,12 +311,31 @@ def fetch_all_tefas_data(date=None):
             'kurucukod': ''
         }
         
+        # Note the cookies this request goes out with before other threads can change them
+        with TEFAS_SESSION_LOCK:
+            sent_cookies = tefas_cookie_values()
+            from_disk = TEFAS_COOKIES_FROM_DISK
+        
         # Make the API request
-        response = session.post(api_url, headers=api_headers, data=data, timeout=30)
-        response.raise_for_status()
+        response = throttled_request('POST', api_url, headers=TEFAS_API_HEADERS, data=data, timeout=30)
+        result = parse_json_response(response)
         
-        # Parse JSON response
-        result = response.json()
+        # Saved cookies may have expired server-side. The API answers that with
+        # 401/403, and cookies loaded from disk that get anything but JSON back
+        # are treated the same way: drop them for good, prime and retry once
+        if result is None and (response.status_code in (401, 403) or from_disk):
+            print(f"API rejected the session cookies ({response.status_code}), refreshing them")
+            if not refresh_tefas_session(sent_cookies, from_disk):
+                return None
+            response = throttled_request('POST', api_url, headers=TEFAS_API_HEADERS, data=data, timeout=30)
+            result = parse_json_response(response)
+        
+        if result is None:
+            # Report the HTTP error or the parse error as before
+            response.raise_for_status()
+            result = json_loads(response.content)
+        with TEFAS_SESSION_LOCK:
+            TEFAS_COOKIES_FROM_DISK = False
         print(f"API returned {result.get('recordsTotal', 0)} total funds")
         
         # Return the full API response
@@ -142,108 +358,249 @@ def fetch_all_tefas_data(date=None):
 
 # Fallback method removed - API approach is reliable and efficient
 
+def format_trimmed(value, spec):
+    """Format a number with spec and drop trailing zeros from its decimals (1.500000 -> 1.5)."""
+    text = format(value, spec)
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+CURRENCY_CODES = {
+    "$": "USD",
+    "£": "GBP",
+    "€": "EUR",
+    "₺": "TRY"
+}
+
 def get_currency_code(currency_symbol):
     """Convert currency symbol to ISO currency code."""
-    currency_map = {
-        "$": "USD",
-        "£": "GBP",
-        "€": "EUR",
-        "₺": "TRY"
-    }
-    return currency_map.get(currency_symbol, "USD")
+    return CURRENCY_CODES.get(currency_symbol, "USD")
+
+# Matches {{PLACEHOLDER}} markers in the HTML templates
+PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+
+class TemplateValues(dict):
+    """Replacement mapping that leaves unknown placeholders untouched."""
+    
+    def __missing__(self, key):
+        return f'{{{{{key}}}}}'
+
+
+def compile_template(template_content):
+    """Convert a {{PLACEHOLDER}} template into a str.format_map template."""
+    parts = PLACEHOLDER_RE.split(template_content)
+    # Even entries are literal text with its braces (CSS) escaped, odd entries are placeholder names
+    return ''.join(
+        part.replace('{', '{{').replace('}', '}}') if i % 2 == 0 else f'{{{part}}}'
+        for i, part in enumerate(parts)
+    )
+
+@functools.lru_cache(maxsize=None)
+def load_template(template_name):
+    """Read, minify and compile an HTML template once, None if the file is missing."""
+    try:
+        return compile_template(minify_html(Path(template_name).read_text(encoding='utf-8')))
+    except FileNotFoundError:
+        return None
 
 def render_template(template_content, replacements):
-    """Render a template by replacing placeholders with actual values."""
-    result = template_content
-    for placeholder, value in replacements.items():
-        result = result.replace(f'{{{{{placeholder}}}}}', str(value))
-    return result
-
-def save_daily_data(market, all_funds_data, date=None):
-    """Save daily fund data as individual HTML files."""
+    """Render a compiled template by filling in all placeholders in one pass."""
+    return template_content.format_map(TemplateValues(replacements))
+
+def bind_template(template_content, replacements):
+    """Fill in the placeholders shared by every page, returning a compiled template for the rest."""
+    return compile_template(render_template(template_content, replacements))
+
+# Known subdirectories per parent directory, shared by every save in this
+# process so back-filling many dates lists each market directory only once
+KNOWN_SUBDIRS = {}
+
+def existing_subdirs(parent_dir):
+    """Names of the directories directly under parent_dir, cached for the process."""
+    # Callers add the directories they create to the returned set
+    key = os.path.abspath(parent_dir)
+    if key not in KNOWN_SUBDIRS:
+        try:
+            with os.scandir(parent_dir) as entries:
+                KNOWN_SUBDIRS[key] = {entry.name for entry in entries if entry.is_dir()}
+        except FileNotFoundError:
+            KNOWN_SUBDIRS[key] = set()
+    return KNOWN_SUBDIRS[key]
+
+def has_content(path, data):
+    """Check whether the file at path already holds exactly data."""
+    try:
+        # A size mismatch settles it with a single stat()
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+def save_page(page_dir, date, content, suffix=".html", update_latest=True):
+    """Write the file for a date and point latest<suffix> at it unless update_latest is False."""
+    filename = f"{date}{suffix}"
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    
+    # Re-running a day usually renders the same bytes, leave those files untouched
+    if not has_content(page_dir / filename, data):
+        # Write under a temp name and rename, so a crash never leaves a truncated page
+        tmp_file = page_dir / f".{filename}.{os.getpid()}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        except BaseException:
+            os.close(fd)
+            os.unlink(tmp_file)
+            raise
+        os.close(fd)
+        os.replace(tmp_file, page_dir / filename)
+    
+    if update_latest:
+        link_latest(page_dir, filename, suffix)
+
+def link_latest(page_dir, filename, suffix=".html"):
+    """Atomically point page_dir/latest<suffix> at filename."""
+    # In steady state the link always exists, so going straight to a temp
+    # link saves a failing symlink() per page
+    tmp_path = page_dir / f".latest{suffix}.{os.getpid()}.tmp"
+    try:
+        os.symlink(filename, tmp_path)
+    except FileExistsError:
+        # Left behind by a crashed run that had the same PID
+        os.unlink(tmp_path)
+        os.symlink(filename, tmp_path)
+    os.replace(tmp_path, page_dir / f"latest{suffix}")
+
+def link_latest_if_newer(page_dir, filename, suffix=".html"):
+    """Point latest<suffix> at filename unless it already points at a later date, True if it moved."""
+    try:
+        current = os.readlink(page_dir / f"latest{suffix}")
+    except OSError:
+        current = ''
+    # Dated file names sort in date order
+    if filename <= current:
+        return False
+    link_latest(page_dir, filename, suffix)
+    return True
+
+def save_market_meta(market_dir, date, count):
+    """Record the date and page count of the last save for a market."""
+    (market_dir / "latest_meta.json").write_bytes(json_dumps({'date': date, 'count': count}))
+
+@contextlib.contextmanager
+def background_page_writer(max_workers=os.cpu_count()):
+    """Run save_page calls on a pool of writer threads, yielding the function that queues one."""
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield lambda *page, **options: futures.append(executor.submit(save_page, *page, **options))
+    
+    # Re-raise the first write error once the pool is drained
+    for future in futures:
+        future.result()
+
+def save_daily_data(market, all_funds_data, date=None, update_latest=True):
+    """Save daily fund data as HTML pages plus a per-date JSON snapshot, returning the fund codes."""
     if date is None:
         date = datetime.datetime.now().strftime("%Y-%m-%d")
     
+    # Timed as a whole and reported in the single summary line below,
+    # nothing is printed per fund
+    start_time = time.perf_counter()
+    
     market_dir = DATA_DIR / market
     market_dir.mkdir(parents=True, exist_ok=True)
     
     # Load the HTML template
-    template_path = Path("fund_template.html")
-    if not template_path.exists():
+    template_content = load_template("fund_template.html")
+    if template_content is None:
         print("Error: fund_template.html not found")
         return
     
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_content = f.read()
-    
     currency = "₺"  # Turkish Lira for TEFAS funds
     saved_count = 0
     
+    # Currency and date are shared by every fund, fill them in once
+    template_content = bind_template(template_content, {'CURRENCY': currency, 'DATE': date})
+    
+    # Each fund is encoded as soon as it is prepared, so the snapshot never
+    # holds a dict per fund, only its compact '"CODE":{...}' bytes
+    fund_codes = []
+    snapshot_parts = []
+    
+    # In steady state every fund directory already exists, so only mkdir new ones
+    existing_dirs = existing_subdirs(market_dir)
+    
     if all_funds_data and 'data' in all_funds_data:
-        for fund in all_funds_data['data']:
-            fund_code = fund.get('FONKODU', '')
-            if fund_code:
-                # Create directory for this fund code
-                fund_dir = market_dir / fund_code
-                fund_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Prepare fund data
-                fund_data = {
-                    'code': fund_code,
-                    'name': fund.get('FONUNVAN', ''),
-                    'price': fund.get('FIYAT', 0),
-                    'shares': fund.get('TEDPAYSAYISI', 0),
-                    'investors': fund.get('KISISAYISI', 0),
-                    'portfolio_size': fund.get('PORTFOYBUYUKLUK', 0),
-                    'currency': currency,
-                    'date': date,
-                    'timestamp': fund.get('TARIH', '')
-                }
-                
-                # Format numbers for display
-                price_str = f"{fund_data['price']:.6f}".rstrip('0').rstrip('.')
-                shares_str = f"{fund_data['shares']:,.0f}" if fund_data['shares'] else "0"
-                investors_str = f"{fund_data['investors']:,.0f}" if fund_data['investors'] else "0"
-                portfolio_str = f"{fund_data['portfolio_size']:,.2f}".rstrip('0').rstrip('.') if fund_data['portfolio_size'] else "0"
-                avg_portfolio_per_investor_str = f"{fund_data['portfolio_size'] / fund_data['investors']:.2f}".rstrip('0').rstrip('.') if fund_data['portfolio_size'] and fund_data['investors'] else "0"
-                # Replace template placeholders
-                html_content = template_content
-                replacements = {
-                    'FUND_CODE': fund_data['code'],
-                    'FUND_NAME': fund_data['name'],
-                    'CURRENCY': fund_data['currency'],
-                    'PRICE': price_str,
-                    'SHARES': shares_str,
-                    'INVESTORS': investors_str,
-                    'PORTFOLIO_SIZE': portfolio_str,
-                    'DATE': fund_data['date'],
-                    'TIMESTAMP': fund_data['timestamp'],
-                    'AVG_PORTFOLIO_PER_INVESTOR': avg_portfolio_per_investor_str
-                }
-                
-                for placeholder, value in replacements.items():
-                    html_content = html_content.replace(f'{{{{{placeholder}}}}}', str(value))
-                
-                # Minify HTML to reduce file size
-                html_content = minify_html(html_content)
-                
-                # Save HTML file for this date
-                html_filename = f"{date}.html"
-                html_path = fund_dir / html_filename
-                
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                
-                # Create/update latest.html symlink or copy
-                latest_path = fund_dir / "latest.html"
-                if latest_path.exists():
-                    latest_path.unlink()
-                latest_path.symlink_to(html_filename)
-                
-                saved_count += 1
+        with background_page_writer() as write_page:
+            for fund in all_funds_data['data']:
+                fund_code = fund.get('FONKODU', '')
+                if fund_code:
+                    # Create directory for this fund code
+                    fund_dir = market_dir / fund_code
+                    if fund_code not in existing_dirs:
+                        fund_dir.mkdir(parents=True, exist_ok=True)
+                        existing_dirs.add(fund_code)
+                    
+                    # Prepare fund data
+                    fund_data = {
+                        'code': fund_code,
+                        'name': fund.get('FONUNVAN', ''),
+                        'price': fund.get('FIYAT', 0),
+                        'shares': fund.get('TEDPAYSAYISI', 0),
+                        'investors': fund.get('KISISAYISI', 0),
+                        'portfolio_size': fund.get('PORTFOYBUYUKLUK', 0),
+                        'currency': currency,
+                        'date': date,
+                        'timestamp': fund.get('TARIH', '')
+                    }
+                    fund_codes.append(fund_code)
+                    snapshot_parts.append(json_dumps(fund_code) + b':' + json_dumps(fund_data))
+                    
+                    # Format numbers for display
+                    price_str = format_trimmed(fund_data['price'], '.6f')
+                    # Counts are whole numbers, round once and use the integer formatter
+                    shares_str = format(round(fund_data['shares']), ',d') if fund_data['shares'] else "0"
+                    investors_str = format(round(fund_data['investors']), ',d') if fund_data['investors'] else "0"
+                    portfolio_str = format_trimmed(fund_data['portfolio_size'], ',.2f') if fund_data['portfolio_size'] else "0"
+                    avg_portfolio_per_investor = fund_data['portfolio_size'] / fund_data['investors'] if fund_data['investors'] else 0
+                    avg_portfolio_per_investor_str = format_trimmed(avg_portfolio_per_investor, '.2f') if avg_portfolio_per_investor else "0"
+                    # Replace template placeholders
+                    replacements = {
+                        'FUND_CODE': fund_data['code'],
+                        'FUND_NAME': fund_data['name'],
+                        'PRICE': price_str,
+                        'SHARES': shares_str,
+                        'INVESTORS': investors_str,
+                        'PORTFOLIO_SIZE': portfolio_str,
+                        'TIMESTAMP': fund_data['timestamp'],
+                        'AVG_PORTFOLIO_PER_INVESTOR': avg_portfolio_per_investor_str
+                    }
+                    html_content = render_template(template_content, replacements)
+                    
+                    write_page(fund_dir, date, html_content, update_latest=update_latest)
+                    
+                    saved_count += 1
     
-    print(f"Saved {saved_count} fund HTML files for {date}")
+    if saved_count:
+        # The snapshot is a JSON object keyed by fund code
+        save_page(market_dir, date, b'{' + b','.join(snapshot_parts) + b'}', suffix=".json", update_latest=update_latest)
+        if update_latest:
+            save_market_meta(market_dir, date, saved_count)
+    
+    print(f"Saved {saved_count} fund HTML files for {date} in {time.perf_counter() - start_time:.2f}s")
+    return fund_codes
+
 
+def link_daily_data(market, date, fund_codes):
+    """Move a market's latest links forward to an already saved date."""
+    market_dir = DATA_DIR / market
+    for fund_code in fund_codes:
+        link_latest_if_newer(market_dir / fund_code, f"{date}.html")
+    if link_latest_if_newer(market_dir, f"{date}.json", ".json"):
+        save_market_meta(market_dir, date, len(fund_codes))
 
 def convert_turkish_to_us_number(turkish_number):
     """Convert Turkish number format to US format.
@@ -260,28 +617,37 @@ def convert_turkish_to_us_number(turkish_number):
     return us_number
 
 
+# Signed change percentage in the gold table, e.g. "%-0,45"
+CHANGE_RE = re.compile(r'([+-]?\d+[,.]?\d*)')
+
+# XPath expressions for the gold table, compiled once instead of on every
+# element.xpath() call: rows of the main table (the second table on the
+# page), the cells of a row and the link in the name cell
+GOLD_ROWS_XPATH = etree.XPath('(//table)[2]//tr')
+ROW_CELLS_XPATH = etree.XPath('.//td')
+CELL_LINK_XPATH = etree.XPath('.//a/@href')
+
+# Parser for the gold page: no id index (we never look elements up by id)
+# and no comment nodes in the tree
+GOLD_HTML_PARSER = html.HTMLParser(collect_ids=False, remove_comments=True)
+
+
 def fetch_gold_prices_table():
     """Fetch the gold prices table from uzmanpara.milliyet.com.tr."""
     url = 'https://uzmanpara.milliyet.com.tr/gram-altin-fiyati/'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = throttled_request('GET', url, timeout=10)
         response.raise_for_status()
         
-        doc = html.fromstring(response.content)
+        doc = html.fromstring(response.content, parser=GOLD_HTML_PARSER)
         
-        # Find the main table with all gold types (second table on the page)
-        tables = doc.xpath('//table')
-        if len(tables) < 2:
+        # Rows of the main table with all gold types
+        rows = GOLD_ROWS_XPATH(doc)
+        if not rows:
             print("Error: Could not find gold prices table")
             return None
         
-        table = tables[1]  # Second table contains all gold types
-        rows = table.xpath('.//tr')
-        
         if len(rows) < 2:
             print("Error: Gold prices table has no data rows")
             return None
@@ -290,7 +656,7 @@ def fetch_gold_prices_table():
         
         # Skip header row (first row)
         for row in rows[1:]:
-            cells = row.xpath('.//td')
+            cells = ROW_CELLS_XPATH(row)
             if len(cells) >= 7:
                 name_cell = cells[1]
                 name = name_cell.text_content().strip()
@@ -300,29 +666,27 @@ def fetch_gold_prices_table():
                     continue
                 
                 # Get link if available
-                link = name_cell.xpath('.//a/@href')
+                link = CELL_LINK_XPATH(name_cell)
                 link = link[0] if link else None
                 
-                # Extract prices and other data
-                buy_price_raw = cells[2].text_content().strip() if len(cells) > 2 else ''
-                sell_price_raw = cells[3].text_content().strip() if len(cells) > 3 else ''
-                change_text = cells[4].text_content().strip() if len(cells) > 4 else ''
-                time_str = cells[6].text_content().strip() if len(cells) > 6 else ''
+                # Extract prices and other data (the row is known to have 7 cells)
+                buy_price_raw = cells[2].text_content().strip()
+                sell_price_raw = cells[3].text_content().strip()
+                change_text = cells[4].text_content().strip()
+                time_str = cells[6].text_content().strip()
                 
                 # Convert Turkish number format to US format
                 buy_price = convert_turkish_to_us_number(buy_price_raw)
                 sell_price = convert_turkish_to_us_number(sell_price_raw)
                 
                 # Parse change percentage (remove % and whitespace)
-                change_match = re.search(r'([+-]?\d+[,.]?\d*)', change_text)
+                change_match = CHANGE_RE.search(change_text)
                 change_value = change_match.group(1) if change_match else '0'
                 # Convert Turkish number format to US format for change
                 change_value = convert_turkish_to_us_number(change_value)
                 try:
-                    change_float = float(change_value)
-                    change_class = 'change-positive' if change_float >= 0 else 'change-negative'
-                except:
-                    change_float = 0
+                    change_class = 'change-positive' if float(change_value) >= 0 else 'change-negative'
+                except ValueError:
                     change_class = 'change-positive'
                 
                 gold_items.append({
@@ -356,113 +720,140 @@ def save_gold_data(gold_items, date=None):
     market_dir.mkdir(parents=True, exist_ok=True)
     
     # Load the HTML template
-    template_path = Path("gold_template.html")
-    if not template_path.exists():
+    template_content = load_template("gold_template.html")
+    if template_content is None:
         print("Error: gold_template.html not found")
         return
     
-    with open(template_path, 'r', encoding='utf-8') as f:
-        template_content = f.read()
+    # The date is shared by every gold item, fill it in once
+    template_content = bind_template(template_content, {'DATE': date})
     
     saved_count = 0
+    existing_dirs = existing_subdirs(market_dir)
     
     if gold_items:
-        for gold_item in gold_items:
-            gold_name = gold_item['name']
-            if not gold_name:
-                continue
-            
-            # Create directory for this gold type (preserve spaces for URL accessibility)
-            # Only remove truly problematic characters, keep spaces
-            safe_name = re.sub(r'[<>:"|?*]', '', gold_name)  # Remove filesystem-invalid chars
-            safe_name = safe_name.strip()  # Remove leading/trailing whitespace
-            gold_dir = market_dir / safe_name
-            gold_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Format change percentage for display (separate number from % sign for easy selection)
-            change_number = gold_item['change_value']
-            
-            # Prepare replacements
-            replacements = {
-                'GOLD_NAME': gold_name,
-                'BUY_PRICE': gold_item['buy_price'],
-                'SELL_PRICE': gold_item['sell_price'],
-                'CHANGE_NUMBER': change_number,
-                'CHANGE_CLASS': gold_item['change_class'],
-                'DATE': date,
-                'TIME': gold_item['time']
-            }
-            
-            # Replace template placeholders
-            html_content = template_content
-            for placeholder, value in replacements.items():
-                html_content = html_content.replace(f'{{{{{placeholder}}}}}', str(value))
-            
-            # Minify HTML to reduce file size
-            html_content = minify_html(html_content)
-            
-            # Save HTML file for this date
-            html_filename = f"{date}.html"
-            html_path = gold_dir / html_filename
-            
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            # Create/update latest.html symlink or copy
-            latest_path = gold_dir / "latest.html"
-            if latest_path.exists():
-                latest_path.unlink()
-            latest_path.symlink_to(html_filename)
-            
-            saved_count += 1
+        with background_page_writer() as write_page:
+            for gold_item in gold_items:
+                gold_name = gold_item['name']
+                if not gold_name:
+                    continue
+                
+                # Create directory for this gold type (preserve spaces for URL accessibility)
+                # Only remove truly problematic characters, keep spaces
+                safe_name = re.sub(r'[<>:"|?*]', '', gold_name)  # Remove filesystem-invalid chars
+                safe_name = safe_name.strip()  # Remove leading/trailing whitespace
+                gold_dir = market_dir / safe_name
+                if safe_name not in existing_dirs:
+                    gold_dir.mkdir(parents=True, exist_ok=True)
+                    existing_dirs.add(safe_name)
+                
+                # Format change percentage for display (separate number from % sign for easy selection)
+                change_number = gold_item['change_value']
+                
+                # Prepare replacements
+                replacements = {
+                    'GOLD_NAME': gold_name,
+                    'BUY_PRICE': gold_item['buy_price'],
+                    'SELL_PRICE': gold_item['sell_price'],
+                    'CHANGE_NUMBER': change_number,
+                    'CHANGE_CLASS': gold_item['change_class'],
+                    'TIME': gold_item['time']
+                }
+                
+                # Replace template placeholders
+                html_content = render_template(template_content, replacements)
+                
+                write_page(gold_dir, date, html_content)
+                
+                saved_count += 1
+    
+    if saved_count:
+        save_market_meta(market_dir, date, saved_count)
     
     print(f"Saved {saved_count} gold price HTML files for {date}")
 
 
 
+# Market configuration with tickers and crawler functions
+MARKETS = {
+    "tr-tefas": {
+        "currency": "₺",
+        "tickers": ["HFA", "YAY", "TTE", "TI2", "AFT"],  # Funds listed in the README, all funds are saved
+        "fetch": fetch_all_tefas_data,
+        "save": save_daily_data,
+    },
+    "gold": {
+        "currency": "₺",
+        "tickers": [],  # Every row of the gold table is saved
+        "fetch": lambda date: fetch_gold_prices_table(),  # The page only shows current prices
+        "save": lambda market, gold_items, date: save_gold_data(gold_items, date),
+    },
+}
+
+# The market set is static, so resolve each market's crawler functions once at import.
+# Fetch functions take the run date, save functions take (market, data, date string)
+PLAN = tuple((market, config["fetch"], config["save"]) for market, config in MARKETS.items())
+
 
-def main():
+def has_fresh_data(market, date=None, ttl_seconds=3600):
+    """Check whether a market was already saved for the date within the TTL."""
+    if date is None:
+        date = datetime.datetime.now().strftime("%Y-%m-%d")
+    
+    meta_path = DATA_DIR / market / "latest_meta.json"
+    try:
+        saved_at = meta_path.stat().st_mtime
+        meta = json_loads(meta_path.read_bytes())
+    except (FileNotFoundError, ValueError):
+        return False
+    
+    return meta.get('date') == date and time.time() - saved_at < ttl_seconds
+
+
+def main(force=False):
     """Main function to fetch and save prices for all tickers."""
     print(f"Starting price crawler at {datetime.datetime.now()}")
     
     success_count = 0
     error_count = 0
     
-    try:
-        print("Fetching all TEFAS funds data in one request...")
-        all_funds_data = fetch_all_tefas_data()
-        
-        if all_funds_data:
-            # Save all the data as individual HTML files
-            save_daily_data("tr-tefas", all_funds_data)
+    # One date for the whole run, used for both fetching and saving, so both
+    # markets agree even across midnight
+    run_date = datetime.date.today()
+    today = run_date.isoformat()
+    
+    # Skip markets that were already saved today on a previous run
+    plan = []
+    for market, fetch, save in PLAN:
+        if not force and has_fresh_data(market, today):
+            print(f"Using cached {market} data from today, skipping fetch")
             success_count += 1
         else:
-            print("Failed to fetch TEFAS data")
-            error_count += 1
-            
-    except Exception as e:
-        error_message = f"Exception while processing TEFAS market: {str(e)}"
-        print(error_message)
-        error_count += 1
+            plan.append((market, fetch, save))
     
-    # Fetch gold prices
-    try:
-        print("\nFetching gold prices from uzmanpara.milliyet.com.tr...")
-        gold_items = fetch_gold_prices_table()
+    # Each market is fetched from a different host, so the network waits can
+    # overlap; saving stays on the main thread as each fetch completes.
+    print(f"Fetching {', '.join(market for market, _, _ in plan) or 'no'} market data in parallel...")
+    with ThreadPoolExecutor(max_workers=max(len(plan), 1)) as executor:
+        futures = {executor.submit(fetch, run_date): (market, save) for market, fetch, save in plan}
         
-        if gold_items:
-            # Save all the gold data as individual HTML files
-            save_gold_data(gold_items)
-            success_count += 1
-        else:
-            print("Failed to fetch gold prices")
-            error_count += 1
-            
-    except Exception as e:
-        error_message = f"Exception while processing gold prices: {str(e)}"
-        print(error_message)
-        error_count += 1
-
+        for future in as_completed(futures):
+            market, save = futures[future]
+            try:
+                market_data = future.result()
+                
+                if market_data:
+                    # Save all the data as individual HTML files
+                    save(market, market_data, today)
+                    success_count += 1
+                else:
+                    print(f"Failed to fetch {market} data")
+                    error_count += 1
+                    
+            except Exception as e:
+                error_message = f"Exception while processing {market} market: {str(e)}"
+                print(error_message)
+                error_count += 1
     
     # Update the index.html file with links to all tickers (TODO: Update for JSON approach)
     # update_index_html()
@@ -471,4 +862,5 @@ def main():
     print(f"Summary: {success_count} successful, {error_count} failed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Usage: python crawler.py [--force]
+    main(force="--force" in sys.argv[1:])
\ No newline at end of file
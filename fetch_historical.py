@@ -6,9 +6,13 @@ Fetches the last 30 days of data and saves as JSON files.
 
 import datetime
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from crawler import fetch_all_tefas_data, save_daily_data, MARKETS
+from crawler import fetch_all_tefas_data, link_daily_data, prime_tefas_session, save_daily_data, MARKETS
+
+# Days fetched concurrently; throttled_request still spaces out the request
+# starts per host, the workers only overlap the API's response time
+HISTORY_WORKERS = 4
 
 def fetch_historical_data(days_back=30):
     """Fetch historical data for the specified number of days."""
@@ -25,6 +29,8 @@ def fetch_historical_data(days_back=30):
     print(f"Date range: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
     print("=" * 60)
     
+    # Collect the days that still need fetching
+    pending_dates = []
     while current_date <= end_date:
         date_str = current_date.strftime('%Y-%m-%d')
         
@@ -34,48 +40,75 @@ def fetch_historical_data(days_back=30):
         
         if json_file.exists():
             print(f"📁 {date_str}: File already exists, skipping...")
-            current_date += datetime.timedelta(days=1)
-            continue
-        
-        print(f"🔄 {date_str}: Fetching data...")
+        else:
+            pending_dates.append(current_date)
         
+        current_date += datetime.timedelta(days=1)
+    
+    if pending_dates:
+        # Prime the cookies once up front instead of racing the workers to do it
         try:
-            # Fetch data for this specific date
-            all_funds_data = fetch_all_tefas_data(current_date)
+            prime_tefas_session()
+        except Exception as e:
+            print(f"❌ Could not prime TEFAS session: {str(e)}")
+    
+    # Newest (date, fund codes) saved by this run, the latest links move there at the end
+    newest_saved = None
+    
+    with ThreadPoolExecutor(max_workers=HISTORY_WORKERS) as executor:
+        futures = []
+        for pending_date in pending_dates:
+            print(f"🔄 {pending_date.strftime('%Y-%m-%d')}: Fetching data...")
+            futures.append(executor.submit(fetch_all_tefas_data, pending_date))
             
-            if all_funds_data and 'data' in all_funds_data and len(all_funds_data['data']) > 0:
-                # Save the data
-                funds_by_code = save_daily_data("tr-tefas", all_funds_data, date_str)
-                
-                fund_count = len(funds_by_code)
-                print(f"✅ {date_str}: Successfully saved {fund_count} funds")
-                success_count += 1
+            # Cookies saved by an earlier run are only trusted once the API accepts
+            # them, let the first day settle that before the others go out
+            if len(futures) == 1:
+                wait(futures)
+        
+        # Save in date order on this thread, leaving the latest links alone for now
+        for pending_date, future in zip(pending_dates, futures):
+            date_str = pending_date.strftime('%Y-%m-%d')
+            
+            try:
+                # Wait for this specific date's data
+                all_funds_data = future.result()
                 
-                # Check if our target funds are included
-                target_funds = MARKETS["tr-tefas"]["tickers"]
-                found_targets = [code for code in target_funds if code in funds_by_code]
-                if found_targets:
-                    print(f"   📊 Found target funds: {', '.join(found_targets)}")
+                if all_funds_data and 'data' in all_funds_data and len(all_funds_data['data']) > 0:
+                    # Save the data
+                    fund_codes = save_daily_data("tr-tefas", all_funds_data, date_str, update_latest=False)
+                    newest_saved = (date_str, fund_codes)
+                    
+                    fund_count = len(fund_codes)
+                    print(f"✅ {date_str}: Successfully saved {fund_count} funds")
+                    success_count += 1
+                    
+                    # Check if our target funds are included
+                    target_funds = MARKETS["tr-tefas"]["tickers"]
+                    found_targets = [code for code in target_funds if code in fund_codes]
+                    if found_targets:
+                        print(f"   📊 Found target funds: {', '.join(found_targets)}")
+                    else:
+                        print(f"   ⚠️  No target funds found (might be weekend/holiday)")
+                        
                 else:
-                    print(f"   ⚠️  No target funds found (might be weekend/holiday)")
+                    print(f"❌ {date_str}: No data available (likely weekend/holiday)")
+                    error_count += 1
                     
-            else:
-                print(f"❌ {date_str}: No data available (likely weekend/holiday)")
+            except Exception as e:
+                print(f"❌ {date_str}: Error - {str(e)}")
                 error_count += 1
-                
-        except Exception as e:
-            print(f"❌ {date_str}: Error - {str(e)}")
-            error_count += 1
-        
-        # Add delay to be respectful to the API
-        time.sleep(2)
-        current_date += datetime.timedelta(days=1)
+    
+    # Point the latest links at the newest day that actually had data (today is
+    # often not published yet), unless they already point at a later day
+    if newest_saved:
+        link_daily_data("tr-tefas", *newest_saved)
     
     print("\n" + "=" * 60)
     print(f"Historical data fetch completed!")
     print(f"✅ Successful: {success_count} days")
     print(f"❌ Failed/Skipped: {error_count} days")
-    print(f"📁 Total files in data/tr-tefas: {len(list(Path('data/tr-tefas').glob('*.json')))}")
+    print(f"📁 Total files in data/tr-tefas: {len(list(Path('data/tr-tefas').glob('????-??-??.json')))}")
 
 def main():
     """Main function to run historical data fetch."""
@@ -25,23 +25,33 @@ def test_crawler():
         market_dir = DATA_DIR / market
         assert market_dir.exists(), f"Market directory {market_dir} was not created"
         
+        # Check the per-date JSON snapshot of all funds and its metadata
+        latest_json = market_dir / "latest.json"
+        assert latest_json.exists(), f"Latest snapshot {latest_json} was not created"
+        with open(latest_json, "r", encoding="utf-8") as f:
+            funds = json.load(f)
+        
+        meta_file = market_dir / "latest_meta.json"
+        assert meta_file.exists(), f"Metadata file {meta_file} was not created"
+        with open(meta_file, "r") as f:
+            meta = json.load(f)
+        assert meta["count"] == len(funds), f"Metadata count {meta['count']} does not match {len(funds)} saved funds"
+        assert os.readlink(latest_json) == f"{meta['date']}.json", f"{latest_json} does not point at {meta['date']}"
+        
         for ticker in tickers:
             ticker_dir = market_dir / ticker
             assert ticker_dir.exists(), f"Ticker directory {ticker_dir} was not created"
             
-            # Check if latest.txt was created
-            latest_file = ticker_dir / "latest.txt"
+            # Check if latest.html was created
+            latest_file = ticker_dir / "latest.html"
             assert latest_file.exists(), f"Latest file {latest_file} was not created"
             
             # Check if the price is a valid number
-            with open(latest_file, "r") as f:
-                price = f.read().strip()
-                try:
-                    price = float(price)
-                    currency = market_info.get("currency", "₺")
-                    print(f"{market}/{ticker}: {currency}{price}")
-                except ValueError:
-                    assert False, f"Price for {market}/{ticker} is not a valid number: {price}"
+            assert ticker in funds, f"{market}/{ticker} is missing from {latest_json}"
+            price = funds[ticker]["price"]
+            assert isinstance(price, (int, float)), f"Price for {market}/{ticker} is not a valid number: {price}"
+            currency = market_info.get("currency", "₺")
+            print(f"{market}/{ticker}: {currency}{price}")
     else:
         print(f"No tickers defined for {market} market")
 
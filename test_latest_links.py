@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for moving the latest links forward, runs offline under a temp data directory.
+"""
+
+import os
+import json
+import datetime
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import crawler
+import fetch_historical
+
+def make_market(fund_codes, dates):
+    """Create a temp data directory with dated fund pages and snapshots, and no links."""
+    data_dir = Path(tempfile.mkdtemp())
+    market_dir = data_dir / "tr-tefas"
+    for fund_code in fund_codes:
+        (market_dir / fund_code).mkdir(parents=True)
+        for date in dates:
+            (market_dir / fund_code / f"{date}.html").write_text(f"{fund_code} {date}")
+    for date in dates:
+        (market_dir / f"{date}.json").write_text("{}")
+    return data_dir
+
+def read_meta(market_dir):
+    """Return latest_meta.json as a dict, None if it was not written."""
+    meta_file = market_dir / "latest_meta.json"
+    if not meta_file.exists():
+        return None
+    with open(meta_file, "r") as f:
+        return json.load(f)
+
+def test_missing_links_are_created():
+    """A market without any links gets them, plus its metadata."""
+    data_dir = make_market(["HFA", "YAY"], ["2024-01-02"])
+    market_dir = data_dir / "tr-tefas"
+    with mock.patch.object(crawler, "DATA_DIR", data_dir):
+        crawler.link_daily_data("tr-tefas", "2024-01-02", ["HFA", "YAY"])
+
+    assert os.readlink(market_dir / "HFA" / "latest.html") == "2024-01-02.html"
+    assert os.readlink(market_dir / "YAY" / "latest.html") == "2024-01-02.html"
+    assert os.readlink(market_dir / "latest.json") == "2024-01-02.json"
+    assert read_meta(market_dir) == {"date": "2024-01-02", "count": 2}
+
+def test_links_move_forward():
+    """Links pointing at an older date move to the newer one."""
+    data_dir = make_market(["HFA"], ["2024-01-02", "2024-01-05"])
+    market_dir = data_dir / "tr-tefas"
+    with mock.patch.object(crawler, "DATA_DIR", data_dir):
+        crawler.link_daily_data("tr-tefas", "2024-01-02", ["HFA"])
+        crawler.link_daily_data("tr-tefas", "2024-01-05", ["HFA"])
+
+    assert os.readlink(market_dir / "HFA" / "latest.html") == "2024-01-05.html"
+    assert os.readlink(market_dir / "latest.json") == "2024-01-05.json"
+    assert read_meta(market_dir) == {"date": "2024-01-05", "count": 1}
+
+def test_links_never_move_backwards():
+    """Back-filling an older date keeps the links and metadata on the newer one."""
+    data_dir = make_market(["HFA"], ["2024-01-02", "2024-01-05"])
+    market_dir = data_dir / "tr-tefas"
+    with mock.patch.object(crawler, "DATA_DIR", data_dir):
+        crawler.link_daily_data("tr-tefas", "2024-01-05", ["HFA"])
+        meta_mtime = (market_dir / "latest_meta.json").stat().st_mtime_ns
+        crawler.link_daily_data("tr-tefas", "2024-01-02", ["HFA"])
+
+    assert os.readlink(market_dir / "HFA" / "latest.html") == "2024-01-05.html"
+    assert os.readlink(market_dir / "latest.json") == "2024-01-05.json"
+    assert read_meta(market_dir) == {"date": "2024-01-05", "count": 1}
+    assert (market_dir / "latest_meta.json").stat().st_mtime_ns == meta_mtime
+
+def test_meta_written_only_when_the_snapshot_link_moves():
+    """Re-linking the date the market already points at leaves the metadata alone."""
+    data_dir = make_market(["HFA"], ["2024-01-02"])
+    market_dir = data_dir / "tr-tefas"
+    with mock.patch.object(crawler, "DATA_DIR", data_dir):
+        crawler.link_daily_data("tr-tefas", "2024-01-02", ["HFA"])
+        (market_dir / "latest_meta.json").unlink()
+        crawler.link_daily_data("tr-tefas", "2024-01-02", ["HFA"])
+
+    assert read_meta(market_dir) is None
+
+def test_link_latest_if_newer():
+    """Only strictly newer targets replace the link, a regular file is replaced too."""
+    page_dir = make_market(["HFA"], ["2024-01-02", "2024-01-05"]) / "tr-tefas" / "HFA"
+    assert crawler.link_latest_if_newer(page_dir, "2024-01-02.html")
+    assert crawler.link_latest_if_newer(page_dir, "2024-01-05.html")
+    assert not crawler.link_latest_if_newer(page_dir, "2024-01-05.html")
+    assert not crawler.link_latest_if_newer(page_dir, "2024-01-02.html")
+    assert os.readlink(page_dir / "latest.html") == "2024-01-05.html"
+
+    # Older trees may hold a copied latest.html instead of a link
+    (page_dir / "latest.html").unlink()
+    (page_dir / "latest.html").write_text("copy")
+    assert crawler.link_latest_if_newer(page_dir, "2024-01-02.html")
+    assert os.readlink(page_dir / "latest.html") == "2024-01-02.html"
+
+def test_backfill_links_newest_saved_day():
+    """A backfill where today has no data yet links the newest day that did."""
+    work_dir = Path(tempfile.mkdtemp())
+    (work_dir / "fund_template.html").write_text("<p>{{FUND_CODE}} {{DATE}}</p>")
+    today = datetime.date.today()
+    newest_saved = (today - datetime.timedelta(days=1)).isoformat()
+
+    def fetch(date):
+        # Nothing published for today yet
+        if date.date() == today:
+            return None
+        return {"data": [{"FONKODU": "HFA", "FIYAT": 1}]}
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        with mock.patch.object(fetch_historical, "fetch_all_tefas_data", side_effect=fetch), \
+             mock.patch.object(fetch_historical, "prime_tefas_session"), \
+             mock.patch("builtins.print"):
+            fetch_historical.fetch_historical_data(2)
+    finally:
+        os.chdir(cwd)
+
+    market_dir = work_dir / "data" / "tr-tefas"
+    assert os.readlink(market_dir / "HFA" / "latest.html") == f"{newest_saved}.html"
+    assert os.readlink(market_dir / "latest.json") == f"{newest_saved}.json"
+    assert read_meta(market_dir) == {"date": newest_saved, "count": 1}
+
+if __name__ == "__main__":
+    test_missing_links_are_created()
+    test_links_move_forward()
+    test_links_never_move_backwards()
+    test_meta_written_only_when_the_snapshot_link_moves()
+    test_link_latest_if_newer()
+    test_backfill_links_newest_saved_day()
+    print("All tests passed!")
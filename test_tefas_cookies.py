@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the saved TEFAS cookies, runs offline against a temp cache file.
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+import crawler
+
+API_PAYLOAD = b'{"recordsTotal": 1, "data": [{"FONKODU": "HFA"}]}'
+
+def use_cache(content):
+    """Point the cookie cache at a temp file holding content and empty the session."""
+    crawler.TEFAS_COOKIE_CACHE = Path(tempfile.mkdtemp()) / "tefas_cookies.json"
+    crawler.TEFAS_COOKIE_CACHE.write_text(content)
+    crawler.SESSION.cookies.clear()
+    crawler.TEFAS_COOKIES_FROM_DISK = False
+
+def cached_cookie(value, expires):
+    """Cache file content holding a single TEFAS cookie."""
+    expires = 'null' if expires is None else int(expires)
+    return f'[{{"name": "ASP.NET_SessionId", "value": "{value}", "domain": "www.tefas.gov.tr", "path": "/", "expires": {expires}}}]'
+
+def fake_tefas(post_status, post_body):
+    """Fake throttled_request: the history page hands out a fresh cookie,
+    the API answers post_status/post_body unless the fresh cookie is sent."""
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(method)
+        response = requests.Response()
+        if method == 'GET':
+            crawler.SESSION.cookies.set('ASP.NET_SessionId', 'fresh', domain='www.tefas.gov.tr', path='/')
+            response.status_code, response._content = 200, b''
+        elif any(cookie.value == 'fresh' for cookie in crawler.tefas_cookies()):
+            response.status_code, response._content = 200, API_PAYLOAD
+        else:
+            response.status_code, response._content = post_status, post_body
+        return response
+
+    return request, calls
+
+def test_valid_cookies_are_loaded():
+    """Unexpired cookies from the cache end up in the session."""
+    use_cache(cached_cookie("saved", time.time() + 86400))
+    assert crawler.load_tefas_cookies()
+    assert [cookie.value for cookie in crawler.tefas_cookies()] == ["saved"]
+
+def test_expired_cookies_are_skipped():
+    """An expired cookie does not count as a primed session."""
+    use_cache(cached_cookie("old", time.time() - 86400))
+    assert not crawler.load_tefas_cookies()
+    assert crawler.tefas_cookies() == []
+
+def test_malformed_cache_is_ignored():
+    """Broken cache files are ignored instead of raising."""
+    for content in ['[{"name": "ASP.NET_SessionId"}]', '{"a": 1}', '3', '[1]', 'not json']:
+        use_cache(content)
+        assert not crawler.load_tefas_cookies(), content
+        assert crawler.tefas_cookies() == [], content
+
+def test_stale_cookies_are_dropped_on_any_failure():
+    """Saved cookies answered with an error page or a 5xx are re-primed and the cache replaced."""
+    for status, body in [(200, b'<html>error</html>'), (500, b''), (403, b'')]:
+        use_cache(cached_cookie("stale", None))
+        request, calls = fake_tefas(status, body)
+        with mock.patch.object(crawler, 'throttled_request', request), mock.patch('builtins.print'):
+            result = crawler.fetch_all_tefas_data()
+        assert result is not None, status
+        assert calls == ['POST', 'GET', 'POST'], (status, calls)
+        assert b'"fresh"' in crawler.TEFAS_COOKIE_CACHE.read_bytes(), status
+
+def test_failed_refresh_deletes_the_cache():
+    """If the history page cannot be reached either, no stale cache is left for the next run."""
+    use_cache(cached_cookie("stale", None))
+    request, calls = fake_tefas(500, b'')
+
+    def page_down(method, url, **kwargs):
+        if method == 'GET':
+            calls.append(method)
+            response = requests.Response()
+            response.status_code, response._content = 503, b''
+            return response
+        return request(method, url, **kwargs)
+
+    with mock.patch.object(crawler, 'throttled_request', page_down), mock.patch('builtins.print'):
+        assert crawler.fetch_all_tefas_data() is None
+    assert calls == ['POST', 'GET']
+    assert not crawler.TEFAS_COOKIE_CACHE.exists()
+
+if __name__ == "__main__":
+    test_valid_cookies_are_loaded()
+    test_expired_cookies_are_skipped()
+    test_malformed_cache_is_ignored()
+    test_stale_cookies_are_dropped_on_any_failure()
+    test_failed_refresh_deletes_the_cache()
+    print("All tests passed!")